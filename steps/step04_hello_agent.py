@@ -1,18 +1,20 @@
 #!/usr/bin/env python3
 """My first AI phone agent -- Hello World edition."""
 
-import json
 import os
-from datetime import datetime
-import requests
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from urllib.request import urlopen
+import orjson
 from dotenv import load_dotenv
 load_dotenv()
 
 def check_ngrok():
     """Auto-detect ngrok tunnel and set SWML_PROXY_URL_BASE."""
     try:
-        resp = requests.get("http://127.0.0.1:4040/api/tunnels", timeout=1)
-        tunnels = resp.json().get("tunnels", [])
+        with urlopen("http://127.0.0.1:4040/api/tunnels", timeout=0.25) as resp:
+            tunnels = orjson.loads(resp.read()).get("tunnels", [])
         for t in tunnels:
             if t.get("proto") == "https":
                 url = t["public_url"]
@@ -32,6 +34,30 @@ check_ngrok()
 
 from signalwire_agents import AgentBase
 
+# Call summaries go in calls/, which is created at startup and again if it goes
+# missing. They queue up on one background thread so disk I/O never holds up a
+# reply, and bursts of calls are written one after another instead of all at once.
+CALLS_DIR = Path("calls")
+try:
+    CALLS_DIR.mkdir(exist_ok=True)
+except OSError:
+    pass  # write_summary() reports the problem if a summary can't be saved
+SUMMARY_WRITER = ThreadPoolExecutor(max_workers=1)
+
+def write_summary(filepath, payload):
+    """Write a serialized call summary to the calls/ folder."""
+    try:
+        try:
+            filepath.write_bytes(payload)
+        except FileNotFoundError:
+            # calls/ was deleted while the agent was running; recreate it
+            filepath.parent.mkdir(exist_ok=True)
+            filepath.write_bytes(payload)
+    except OSError as e:
+        print(f"Could not save call summary {filepath}: {e}")
+        return
+    print(f"Call summary saved: {filepath}")
+
 class HelloAgent(AgentBase):
     def __init__(self):
         super().__init__(name="hello-agent")
@@ -59,12 +85,10 @@ class HelloAgent(AgentBase):
 
     def on_summary(self, summary, raw_data):
         """Save post-prompt data to calls/ folder for debugging."""
-        os.makedirs("calls", exist_ok=True)
-        call_id = (raw_data or {}).get("call_id", datetime.now().strftime("%Y%m%d_%H%M%S"))
-        filepath = os.path.join("calls", f"{call_id}.json")
-        with open(filepath, "w") as f:
-            json.dump(raw_data, f, indent=2, default=str)
-        print(f"Call summary saved: {filepath}")
+        call_id = (raw_data or {}).get("call_id") or time.strftime("%Y%m%d_%H%M%S")
+        filepath = CALLS_DIR / f"{call_id}.json"
+        payload = orjson.dumps(raw_data, default=str, option=orjson.OPT_INDENT_2)
+        SUMMARY_WRITER.submit(write_summary, filepath, payload)
 
 if __name__ == "__main__":
     agent = HelloAgent()
@@ -1,18 +1,25 @@
 #!/usr/bin/env python3
 """Agent that tells fresh dad jokes from API Ninjas."""
 
-import json
 import os
-from datetime import datetime
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FetchTimeout
+from pathlib import Path
+from urllib.request import urlopen
+import orjson
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util import Retry
 from dotenv import load_dotenv
 load_dotenv()
 
 def check_ngrok():
     """Auto-detect ngrok tunnel and set SWML_PROXY_URL_BASE."""
     try:
-        resp = requests.get("http://127.0.0.1:4040/api/tunnels", timeout=1)
-        tunnels = resp.json().get("tunnels", [])
+        with urlopen("http://127.0.0.1:4040/api/tunnels", timeout=0.25) as resp:
+            tunnels = orjson.loads(resp.read()).get("tunnels", [])
         for t in tunnels:
             if t.get("proto") == "https":
                 url = t["public_url"]
@@ -32,6 +39,85 @@ check_ngrok()
 
 from signalwire_agents import AgentBase, SwaigFunctionResult
 
+# Call summaries go in calls/, which is created at startup and again if it goes
+# missing. They queue up on one background thread so disk I/O never holds up a
+# reply, and bursts of calls are written one after another instead of all at once.
+CALLS_DIR = Path("calls")
+try:
+    CALLS_DIR.mkdir(exist_ok=True)
+except OSError:
+    pass  # write_summary() reports the problem if a summary can't be saved
+SUMMARY_WRITER = ThreadPoolExecutor(max_workers=1)
+
+def write_summary(filepath, payload):
+    """Write a serialized call summary to the calls/ folder."""
+    try:
+        try:
+            filepath.write_bytes(payload)
+        except FileNotFoundError:
+            # calls/ was deleted while the agent was running; recreate it
+            filepath.parent.mkdir(exist_ok=True)
+            filepath.write_bytes(payload)
+    except OSError as e:
+        print(f"Could not save call summary {filepath}: {e}")
+        return
+    print(f"Call summary saved: {filepath}")
+
+# API keys are read once at startup instead of on every request
+API_NINJAS_KEY = os.getenv("API_NINJAS_KEY", "")
+JOKE_HEADERS = {"X-Api-Key": API_NINJAS_KEY}
+
+# One shared session keeps the connection to API Ninjas open between jokes. A
+# 502/503/504 is retried once, right away (Retry-After is ignored so it can't
+# stall the call); connect and read errors are not retried.
+SESSION = requests.Session()
+SESSION.mount("https://", HTTPAdapter(max_retries=Retry(
+    total=1, connect=0, read=0, other=0,
+    status_forcelist=[502, 503, 504],
+    respect_retry_after_header=False,
+)))
+
+# Jokes waiting to be told. Whenever fewer than JOKE_LOW_WATER are left, the
+# handler sets JOKE_REFILL_WANTED and a background thread tops the buffer up so
+# callers rarely wait on the API. deque pops are atomic, so concurrent calls can
+# share it without a lock.
+JOKE_BUFFER = deque(maxlen=64)
+JOKE_LOW_WATER = 2
+JOKE_REFILL_WANTED = threading.Event()
+
+# requests timeouts apply to each socket operation, not the whole lookup, so a
+# slow API could still hold a caller for a long time. Inline fetches run on
+# JOKE_FETCHER instead, and the handler stops waiting after JOKE_DEADLINE seconds.
+JOKE_DEADLINE = 4
+JOKE_FETCHER = ThreadPoolExecutor(max_workers=4)
+
+def fetch_jokes():
+    """Fetch a batch of dad jokes from API Ninjas."""
+    resp = SESSION.get(
+        "https://api.api-ninjas.com/v1/dadjokes",
+        headers=JOKE_HEADERS,
+        timeout=(1, 2),  # seconds to connect, seconds to read
+    )
+    resp.raise_for_status()
+    return [j["joke"] for j in resp.json()]
+
+def refill_jokes():
+    """Top up JOKE_BUFFER to JOKE_LOW_WATER each time a refill is requested."""
+    while True:
+        JOKE_REFILL_WANTED.wait()
+        JOKE_REFILL_WANTED.clear()
+        try:
+            while len(JOKE_BUFFER) < JOKE_LOW_WATER:
+                jokes = fetch_jokes()
+                if not jokes:
+                    break
+                JOKE_BUFFER.extend(jokes)
+        except requests.RequestException:
+            pass
+
+# A daemon thread, so short-lived runs like swaig-test exit without waiting on it
+threading.Thread(target=refill_jokes, daemon=True).start()
+
 class JokeAgent(AgentBase):
     def __init__(self):
         super().__init__(name="joke-agent")
@@ -73,32 +159,32 @@ class JokeAgent(AgentBase):
         )
 
     def on_tell_joke(self, args, raw_data):
-        api_key = os.getenv("API_NINJAS_KEY", "")
-        if not api_key:
+        if not API_NINJAS_KEY:
             return SwaigFunctionResult("Sorry, I can't access my joke book right now. My API key is missing.")
 
         try:
-            resp = requests.get(
-                "https://api.api-ninjas.com/v1/dadjokes",
-                headers={"X-Api-Key": api_key},
-                timeout=5,
-            )
-            resp.raise_for_status()
-            jokes = resp.json()
-            if jokes:
-                return SwaigFunctionResult(f"Here's a dad joke: {jokes[0]['joke']}")
-            return SwaigFunctionResult("I tried to find a joke but came up empty. That's... kind of a joke itself?")
-        except requests.RequestException:
-            return SwaigFunctionResult("Sorry, my joke service is taking a nap. Ask me again in a moment!")
+            joke = JOKE_BUFFER.popleft()
+        except IndexError:
+            try:
+                jokes = JOKE_FETCHER.submit(fetch_jokes).result(timeout=JOKE_DEADLINE)
+            except (requests.RequestException, FetchTimeout):
+                return SwaigFunctionResult("Sorry, my joke service is taking a nap. Ask me again in a moment!")
+            if not jokes:
+                return SwaigFunctionResult("I tried to find a joke but came up empty. That's... kind of a joke itself?")
+            joke = jokes.pop(0)
+            JOKE_BUFFER.extend(jokes)
+
+        if len(JOKE_BUFFER) < JOKE_LOW_WATER:
+            JOKE_REFILL_WANTED.set()
+
+        return SwaigFunctionResult(f"Here's a dad joke: {joke}")
 
     def on_summary(self, summary, raw_data):
         """Save post-prompt data to calls/ folder for debugging."""
-        os.makedirs("calls", exist_ok=True)
-        call_id = (raw_data or {}).get("call_id", datetime.now().strftime("%Y%m%d_%H%M%S"))
-        filepath = os.path.join("calls", f"{call_id}.json")
-        with open(filepath, "w") as f:
-            json.dump(raw_data, f, indent=2, default=str)
-        print(f"Call summary saved: {filepath}")
+        call_id = (raw_data or {}).get("call_id") or time.strftime("%Y%m%d_%H%M%S")
+        filepath = CALLS_DIR / f"{call_id}.json"
+        payload = orjson.dumps(raw_data, default=str, option=orjson.OPT_INDENT_2)
+        SUMMARY_WRITER.submit(write_summary, filepath, payload)
 
 if __name__ == "__main__":
     agent = JokeAgent()
@@ -12,18 +12,28 @@ Run: python complete_agent.py
 Test: swaig-test complete_agent.py --dump-swml
 """
 
-import json
+import copy
 import os
-from datetime import datetime
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FetchTimeout
+from functools import lru_cache
+from pathlib import Path
+from urllib.parse import urlencode
+from urllib.request import urlopen
+import orjson
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util import Retry
 from dotenv import load_dotenv
 load_dotenv()
 
 def check_ngrok():
     """Auto-detect ngrok tunnel and set SWML_PROXY_URL_BASE."""
     try:
-        resp = requests.get("http://127.0.0.1:4040/api/tunnels", timeout=1)
-        tunnels = resp.json().get("tunnels", [])
+        with urlopen("http://127.0.0.1:4040/api/tunnels", timeout=0.25) as resp:
+            tunnels = orjson.loads(resp.read()).get("tunnels", [])
         for t in tunnels:
             if t.get("proto") == "https":
                 url = t["public_url"]
@@ -44,6 +54,93 @@ check_ngrok()
 from signalwire_agents import AgentBase, SwaigFunctionResult
 from signalwire_agents.core.data_map import DataMap
 
+# Call summaries go in calls/, which is created at startup and again if it goes
+# missing. They queue up on one background thread so disk I/O never holds up a
+# reply, and bursts of calls are written one after another instead of all at once.
+CALLS_DIR = Path("calls")
+try:
+    CALLS_DIR.mkdir(exist_ok=True)
+except OSError:
+    pass  # write_summary() reports the problem if a summary can't be saved
+SUMMARY_WRITER = ThreadPoolExecutor(max_workers=1)
+
+def write_summary(filepath, payload):
+    """Write a serialized call summary to the calls/ folder."""
+    try:
+        try:
+            filepath.write_bytes(payload)
+        except FileNotFoundError:
+            # calls/ was deleted while the agent was running; recreate it
+            filepath.parent.mkdir(exist_ok=True)
+            filepath.write_bytes(payload)
+    except OSError as e:
+        print(f"Could not save call summary {filepath}: {e}")
+        return
+    print(f"Call summary saved: {filepath}")
+
+# API keys are read once at startup instead of on every request
+API_NINJAS_KEY = os.getenv("API_NINJAS_KEY", "")
+WEATHER_API_KEY = os.getenv("WEATHER_API_KEY", "")
+JOKE_HEADERS = {"X-Api-Key": API_NINJAS_KEY}
+
+# The key is encoded into the weather URL once; SignalWire fills in the city per call
+WEATHER_URL = (
+    "https://api.weatherapi.com/v1/current.json?"
+    + urlencode({"key": WEATHER_API_KEY})
+    + "&q=${enc:args.city}"
+)
+
+# One shared session keeps the connection to API Ninjas open between jokes. A
+# 502/503/504 is retried once, right away (Retry-After is ignored so it can't
+# stall the call); connect and read errors are not retried.
+SESSION = requests.Session()
+SESSION.mount("https://", HTTPAdapter(max_retries=Retry(
+    total=1, connect=0, read=0, other=0,
+    status_forcelist=[502, 503, 504],
+    respect_retry_after_header=False,
+)))
+
+# Jokes waiting to be told. Whenever fewer than JOKE_LOW_WATER are left, the
+# handler sets JOKE_REFILL_WANTED and a background thread tops the buffer up so
+# callers rarely wait on the API. deque pops are atomic, so concurrent calls can
+# share it without a lock.
+JOKE_BUFFER = deque(maxlen=64)
+JOKE_LOW_WATER = 2
+JOKE_REFILL_WANTED = threading.Event()
+
+# requests timeouts apply to each socket operation, not the whole lookup, so a
+# slow API could still hold a caller for a long time. Inline fetches run on
+# JOKE_FETCHER instead, and the handler stops waiting after JOKE_DEADLINE seconds.
+JOKE_DEADLINE = 4
+JOKE_FETCHER = ThreadPoolExecutor(max_workers=4)
+
+def fetch_jokes():
+    """Fetch a batch of dad jokes from API Ninjas."""
+    resp = SESSION.get(
+        "https://api.api-ninjas.com/v1/dadjokes",
+        headers=JOKE_HEADERS,
+        timeout=(1, 2),  # seconds to connect, seconds to read
+    )
+    resp.raise_for_status()
+    return [j["joke"] for j in resp.json()]
+
+def refill_jokes():
+    """Top up JOKE_BUFFER to JOKE_LOW_WATER each time a refill is requested."""
+    while True:
+        JOKE_REFILL_WANTED.wait()
+        JOKE_REFILL_WANTED.clear()
+        try:
+            while len(JOKE_BUFFER) < JOKE_LOW_WATER:
+                jokes = fetch_jokes()
+                if not jokes:
+                    break
+                JOKE_BUFFER.extend(jokes)
+        except requests.RequestException:
+            pass
+
+# A daemon thread, so short-lived runs like swaig-test exit without waiting on it
+threading.Thread(target=refill_jokes, daemon=True).start()
+
 
 class CompleteAgent(AgentBase):
     def __init__(self):
@@ -157,39 +254,40 @@ class CompleteAgent(AgentBase):
         )
 
     def on_tell_joke(self, args, raw_data):
-        api_key = os.getenv("API_NINJAS_KEY", "")
-        if not api_key:
+        if not API_NINJAS_KEY:
             return SwaigFunctionResult(
                 "Sorry, my joke book is unavailable right now."
             )
 
         try:
-            resp = requests.get(
-                "https://api.api-ninjas.com/v1/dadjokes",
-                headers={"X-Api-Key": api_key},
-                timeout=5,
-            )
-            resp.raise_for_status()
-            jokes = resp.json()
-            if jokes:
+            joke = JOKE_BUFFER.popleft()
+        except IndexError:
+            try:
+                jokes = JOKE_FETCHER.submit(fetch_jokes).result(timeout=JOKE_DEADLINE)
+            except (requests.RequestException, FetchTimeout):
                 return SwaigFunctionResult(
-                    f"Here's a dad joke: {jokes[0]['joke']}"
+                    "My joke service is taking a break. Try again in a moment!"
                 )
-            return SwaigFunctionResult(
-                "I couldn't find a joke this time. Try again!"
-            )
-        except requests.RequestException:
-            return SwaigFunctionResult(
-                "My joke service is taking a break. Try again in a moment!"
-            )
+            if not jokes:
+                return SwaigFunctionResult(
+                    "I couldn't find a joke this time. Try again!"
+                )
+            joke = jokes.pop(0)
+            JOKE_BUFFER.extend(jokes)
+
+        if len(JOKE_BUFFER) < JOKE_LOW_WATER:
+            JOKE_REFILL_WANTED.set()
+
+        return SwaigFunctionResult(f"Here's a dad joke: {joke}")
 
     # ------------------------------------------------------------------
     # Weather -- DataMap (runs on SignalWire, not our server)
     # ------------------------------------------------------------------
 
-    def _register_weather_datamap(self):
-        api_key = os.getenv("WEATHER_API_KEY", "")
-
+    @staticmethod
+    @lru_cache(maxsize=1)
+    def _weather_function():
+        """Build the get_weather DataMap once and share it across agent instances."""
         weather_dm = (
             DataMap("get_weather")
             .description(
@@ -201,11 +299,7 @@ class CompleteAgent(AgentBase):
                 "The city to get weather for",
                 required=True,
             )
-            .webhook(
-                "GET",
-                "https://api.weatherapi.com/v1/current.json"
-                f"?key={api_key}&q=${{enc:args.city}}"
-            )
+            .webhook("GET", WEATHER_URL)
             .output(SwaigFunctionResult(
                 "Weather in ${args.city}: "
                 "${response.current.condition.text}, "
@@ -218,8 +312,10 @@ class CompleteAgent(AgentBase):
                 "Please check the city name and try again."
             ))
         )
+        return weather_dm.to_swaig_function()
 
-        self.register_swaig_function(weather_dm.to_swaig_function())
+    def _register_weather_datamap(self):
+        self.register_swaig_function(copy.deepcopy(self._weather_function()))
 
     # ------------------------------------------------------------------
     # Skills -- built-in, zero-code capabilities
@@ -245,12 +341,10 @@ class CompleteAgent(AgentBase):
 
         View saved files at: https://postpromptviewer.signalwire.io/
         """
-        os.makedirs("calls", exist_ok=True)
-        call_id = (raw_data or {}).get("call_id", datetime.now().strftime("%Y%m%d_%H%M%S"))
-        filepath = os.path.join("calls", f"{call_id}.json")
-        with open(filepath, "w") as f:
-            json.dump(raw_data, f, indent=2, default=str)
-        print(f"Call summary saved: {filepath}")
+        call_id = (raw_data or {}).get("call_id") or time.strftime("%Y%m%d_%H%M%S")
+        filepath = CALLS_DIR / f"{call_id}.json"
+        payload = orjson.dumps(raw_data, default=str, option=orjson.OPT_INDENT_2)
+        SUMMARY_WRITER.submit(write_summary, filepath, payload)
 
 
 if __name__ == "__main__":